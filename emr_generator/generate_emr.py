@@ -20,6 +20,7 @@ import argparse
 import json
 import os
 import sys
+import time
 from pathlib import Path
 
 try:
@@ -46,54 +47,85 @@ def _load_env() -> None:
         pass
 
 
-def call_gemini_for_emr(conversation_text: str, api_key: str, model: str = "gemini-2.5-flash") -> dict | None:
-    """Call Gemini to extract and structure EMR data from conversation text.
-
-    Returns a JSON-compatible dict or None on failure.
-    """
-    if not genai:
-        return None
-
-    try:
-        client = genai.Client(api_key=api_key)
-    except Exception as e:
-        print(f"Failed to initialize Gemini client: {e}", file=sys.stderr)
-        return None
-
-    # Build a detailed prompt for EMR extraction
-    prompt = f"""You are a medical documentation expert. Extract and structure the following doctor-patient conversation into a JSON-formatted EMR document.
-
-Follow this exact JSON schema:
-{{
-  "patientStoryboard": {{
+EMR_SCHEMA = """{
+  "patientStoryboard": {
     "name": "...",
     "dob": "MM/DD/YYYY or blank if unknown",
     "age": "number or blank",
     "mrn": "Medical Record Number or blank",
     "chiefComplaint": "..."
-  }},
-  "vitalsFlowsheet": {{
-    "temp": {{"value": "number or blank", "unit": "°F or °C or blank", "status": "Normal/Elevated/Low/blank"}},
-    "hr": {{"value": "number or blank", "unit": "bpm or blank", "status": "Normal/Elevated/Low/blank"}},
-    "bp": {{"value": "###/## or blank", "unit": "mmHg or blank", "status": "Normal/Elevated/Low/blank"}},
-    "rr": {{"value": "number or blank", "unit": "breaths/min or blank", "status": "Normal/Elevated/Low/blank"}},
-    "o2Sat": {{"value": "number or blank", "unit": "% or blank", "status": "Normal/Low/blank"}}
-  }},
-  "clinicalNotes": {{
+  },
+  "vitalsFlowsheet": {
+    "temp": {"value": "number or blank", "unit": "°F or °C or blank", "status": "Normal/Elevated/Low/blank"},
+    "hr": {"value": "number or blank", "unit": "bpm or blank", "status": "Normal/Elevated/Low/blank"},
+    "bp": {"value": "###/## or blank", "unit": "mmHg or blank", "status": "Normal/Elevated/Low/blank"},
+    "rr": {"value": "number or blank", "unit": "breaths/min or blank", "status": "Normal/Elevated/Low/blank"},
+    "o2Sat": {"value": "number or blank", "unit": "% or blank", "status": "Normal/Low/blank"}
+  },
+  "clinicalNotes": {
     "subjective": "Patient's reported symptoms and history. Be detailed and clear.",
     "objective": "Physical exam findings, lab results, imaging. Note: if not mentioned in conversation, write (not documented) or leave blank.",
     "assessment": "Doctor's clinical impression and suspected diagnoses.",
     "plan": "Treatment plan, medications, orders, and follow-up."
-  }},
+  },
   "suspectedICD10": [
-    {{"code": "K35.80", "description": "Unspecified acute appendicitis"}}
+    {"code": "K35.80", "description": "Unspecified acute appendicitis"}
   ],
   "activeOrders": [
     "CT Abdomen/Pelvis",
     "IV Fluids",
     "Zofran 4mg IV"
   ]
-}}
+}"""
+
+
+def parse_json_text(text: str) -> dict:
+    """Parse a JSON object from model output, tolerating a surrounding markdown code block.
+
+    Raises json.JSONDecodeError if the text is not valid JSON.
+    """
+    json_str = text.strip()
+    # Remove markdown code blocks if present
+    if json_str.startswith("```"):
+        json_str = json_str.split("```")[1]
+        if json_str.startswith("json"):
+            json_str = json_str[4:]
+    return json.loads(json_str.strip())
+
+
+def _remaining_ms(deadline: float | None) -> int | None:
+    """Whole milliseconds left until deadline (a time.monotonic() value), or None without one."""
+    if deadline is None:
+        return None
+    return max(0, int((deadline - time.monotonic()) * 1000))
+
+
+def call_gemini_for_emr(
+    conversation_text: str, api_key: str, model: str = "gemini-2.5-flash", deadline: float | None = None
+) -> dict | None:
+    """Call Gemini to extract and structure EMR data from conversation text.
+
+    Returns a JSON-compatible dict or None on failure. If deadline (a time.monotonic() value)
+    is given, the request is bounded by the time left and skipped once it has passed.
+    """
+    if not genai:
+        return None
+    timeout_ms = _remaining_ms(deadline)
+    if timeout_ms == 0:
+        print("EMR deadline reached; skipping Gemini.", file=sys.stderr)
+        return None
+
+    try:
+        client = genai.Client(api_key=api_key)
+    except Exception as e:
+        print(f"Failed to initialize Gemini client: {e}", file=sys.stderr)
+        return None
+
+    # Build a detailed prompt for EMR extraction
+    prompt = f"""You are a medical documentation expert. Extract and structure the following doctor-patient conversation into a JSON-formatted EMR document.
+
+Follow this exact JSON schema:
+{EMR_SCHEMA}
 
 Conversation:
 {conversation_text}
@@ -101,21 +133,13 @@ Conversation:
 Return ONLY valid JSON (no markdown, no explanation). If a field cannot be inferred from the conversation, leave it as an empty string or empty array."""
 
     try:
-        response = client.models.generate_content(model=model, contents=prompt)
+        config = {"http_options": {"timeout": timeout_ms}} if timeout_ms is not None else None
+        response = client.models.generate_content(model=model, contents=prompt, config=config)
         if not response or not getattr(response, "text", None):
             print("Gemini returned no response.", file=sys.stderr)
             return None
 
-        # Parse the JSON response
-        json_str = response.text.strip()
-        # Remove markdown code blocks if present
-        if json_str.startswith("```"):
-            json_str = json_str.split("```")[1]
-            if json_str.startswith("json"):
-                json_str = json_str[4:]
-        json_str = json_str.strip()
-
-        emr_data = json.loads(json_str)
+        emr_data = parse_json_text(response.text)
         return emr_data
     except json.JSONDecodeError as e:
         print(f"Failed to parse Gemini's JSON response: {e}", file=sys.stderr)
@@ -0,0 +1,221 @@
+"""
+Local stand-in for the Gemini `generateContent` endpoint, for load testing.
+
+Answers every prompt the pipeline sends (speaker labels, patient summary, EMR JSON,
+fused JSON and chat turns) with a canned but well-formed response. Latency per request
+follows a log-normal distribution plus a term proportional to the prompt length, and a
+configurable share of requests fail with HTTP 429 or 500.
+
+Point the google-genai SDK at it with the `GOOGLE_GEMINI_BASE_URL` environment variable.
+
+Run standalone:
+    python loadtest/fake_gemini.py --port 8765 --latency-median 0.8 --rate-429 0.05
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_CANNED_SUMMARY = (
+    "TL;DR: Your foot is likely sprained and should heal with rest.\n"
+    "- Rest the foot and keep it raised.\n"
+    "- Take ibuprofen 400 mg every 8 hours with food.\n"
+    "- Come back if the pain gets worse or you cannot walk."
+)
+
+_CANNED_EMR = {
+    "patientStoryboard": {"name": "", "dob": "", "age": "", "mrn": "", "chiefComplaint": "Left foot pain"},
+    "vitalsFlowsheet": {
+        "temp": {"value": "", "unit": "", "status": ""},
+        "hr": {"value": "", "unit": "", "status": ""},
+        "bp": {"value": "", "unit": "", "status": ""},
+        "rr": {"value": "", "unit": "", "status": ""},
+        "o2Sat": {"value": "", "unit": "", "status": ""},
+    },
+    "clinicalNotes": {
+        "subjective": "Left foot pain after jumping from a height, 7/10, not relieved by ibuprofen.",
+        "objective": "(not documented)",
+        "assessment": "Suspected foot sprain; rule out fracture.",
+        "plan": "X-ray left foot, rest, ice, elevation, NSAIDs.",
+    },
+    "suspectedICD10": [{"code": "S93.602A", "description": "Unspecified sprain of left foot, initial encounter"}],
+    "activeOrders": ["X-ray Left Foot"],
+}
+
+_CANNED_CHAT = "You hurt your foot when you jumped. Rest it, keep it up, and take the pain medicine your doctor told you about."
+
+
+def _prompt_text(body: dict) -> str:
+    """Concatenate the text parts of the last content in a generateContent request body."""
+    contents = body.get("contents") or []
+    if not contents:
+        return ""
+    parts = contents[-1].get("parts") or []
+    return "\n".join(p.get("text", "") for p in parts if isinstance(p, dict))
+
+
+def _labels(num_turns: int) -> list[str]:
+    return ["Doctor" if i % 3 != 1 else "Patient" for i in range(num_turns)]
+
+
+def canned_reply(body: dict) -> str:
+    """Pick a response that matches what the pipeline stage behind this request expects."""
+    prompt = _prompt_text(body)
+    num_turns = len(re.findall(r"^Turn \d+:", prompt, flags=re.MULTILINE))
+    if '"labels"' in prompt and '"emr"' in prompt:
+        return json.dumps({"labels": _labels(num_turns), "summary": _CANNED_SUMMARY, "emr": _CANNED_EMR})
+    if "Labels (one per line):" in prompt:
+        return "\n".join(_labels(num_turns))
+    if "JSON-formatted EMR" in prompt:
+        return json.dumps(_CANNED_EMR)
+    if prompt.rstrip().endswith("Summary:"):
+        return _CANNED_SUMMARY
+    return _CANNED_CHAT
+
+
+class FakeGemini:
+    """Configuration and counters shared by all request handler threads."""
+
+    def __init__(
+        self,
+        latency_median: float = 0.8,
+        latency_sigma: float = 0.5,
+        latency_per_kchar: float = 0.02,
+        rate_429: float = 0.0,
+        rate_500: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.latency_per_kchar = latency_per_kchar
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {"requests": 0, "429": 0, "500": 0, "input_chars": 0}
+
+    def draw(self, prompt_chars: int) -> tuple[float, int]:
+        """Return (latency_seconds, http_status) for one request and update the counters."""
+        with self._lock:
+            latency = self.latency_median * math.exp(self._random.gauss(0.0, self.latency_sigma))
+            latency += self.latency_per_kchar * prompt_chars / 1000.0
+            roll = self._random.random()
+            status = 429 if roll < self.rate_429 else 500 if roll < self.rate_429 + self.rate_500 else 200
+            self.counts["requests"] += 1
+            self.counts["input_chars"] += prompt_chars
+            if status != 200:
+                self.counts[str(status)] += 1
+        if status == 429:
+            # Quota rejections come back quickly, before any generation work.
+            latency = min(latency, 0.05)
+        return latency, status
+
+
+def _make_handler(fake: FakeGemini) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args) -> None:  # noqa: A002
+            pass
+
+        def _send_json(self, status: int, payload: dict) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up first, e.g. its per-call timeout from a deadline expired.
+                self.close_connection = True
+
+        def do_POST(self) -> None:  # noqa: N802
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._send_json(400, {"error": {"code": 400, "message": "Invalid JSON", "status": "INVALID_ARGUMENT"}})
+                return
+            if not self.path.split("?", 1)[0].endswith(":generateContent"):
+                self._send_json(404, {"error": {"code": 404, "message": f"Unsupported path {self.path}", "status": "NOT_FOUND"}})
+                return
+
+            prompt_chars = sum(
+                len(p.get("text", "")) for c in body.get("contents") or [] for p in c.get("parts") or [] if isinstance(p, dict)
+            )
+            latency, status = fake.draw(prompt_chars)
+            time.sleep(latency)
+            if status == 429:
+                self._send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).", "status": "RESOURCE_EXHAUSTED"}})
+                return
+            if status == 500:
+                self._send_json(500, {"error": {"code": 500, "message": "An internal error has occurred.", "status": "INTERNAL"}})
+                return
+
+            text = canned_reply(body)
+            self._send_json(200, {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_chars // 4,
+                    "candidatesTokenCount": len(text) // 4,
+                    "totalTokenCount": (prompt_chars + len(text)) // 4,
+                },
+            })
+
+    return Handler
+
+
+def start_server(fake: FakeGemini, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the stand-in server on a background thread. Use port 0 to pick a free port."""
+    server = ThreadingHTTPServer((host, port), _make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register the latency and fault-injection options shared with load_test.py."""
+    parser.add_argument("--latency-median", type=float, default=0.8, help="Median base latency per request in seconds (default: 0.8)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal sigma of the base latency (default: 0.5)")
+    parser.add_argument("--latency-per-kchar", type=float, default=0.02, help="Extra seconds per 1000 prompt characters (default: 0.02)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Share of requests answered with HTTP 429 (default: 0)")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="Share of requests answered with HTTP 500 (default: 0)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for latency and fault injection")
+
+
+def fake_from_args(args: argparse.Namespace) -> FakeGemini:
+    return FakeGemini(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        latency_per_kchar=args.latency_per_kchar,
+        rate_429=args.rate_429,
+        rate_500=args.rate_500,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local stand-in Gemini server for load testing.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), _make_handler(fake_from_args(args)))
+    server.daemon_threads = True
+    print(f"Fake Gemini listening on http://{args.host}:{args.port} (set GOOGLE_GEMINI_BASE_URL to this URL)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Load test: replay conversations through the full encounter flow at a set arrival rate.
+
+Each simulated encounter runs the pipeline (speaker labels, patient summary, EMR, per
+pipeline/run_pipeline.py) and then one patient chat turn (per chat/chat.py). Encounters
+arrive as a Poisson process at `--rate` per second and at most `--concurrency` run at once;
+the rest wait in a queue, and that wait counts towards their latency.
+
+By default a local stand-in Gemini server (loadtest/fake_gemini.py) is started in-process
+and the google-genai SDK is pointed at it through `GOOGLE_GEMINI_BASE_URL`. Pass
+`--base-url` to target a server that is already running instead.
+
+Defaults:
+ - corpus: `speaker_diarization/conversation.txt`
+ - 50 encounters, 2 arrivals/s, concurrency 8
+
+Report: p50/p95/p99 latency, throughput, error rate, fallback rate (overall and per
+stage), fused redo rate, timed-out rate (with `--budget`), server-side request and fault
+counts, and peak memory.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+for _stage_dir in ("pipeline", "chat", "loadtest"):
+    sys.path.insert(0, str(_REPO_ROOT / _stage_dir))
+
+from fake_gemini import add_server_arguments, fake_from_args, start_server  # noqa: E402
+
+_CHAT_QUESTION = "What should I do when I get home?"
+
+
+def load_corpus(paths: list[str]) -> list[str]:
+    """Read every .txt file named directly or found inside a named directory."""
+    texts = []
+    for p in paths:
+        path = Path(p)
+        files = sorted(path.glob("*.txt")) if path.is_dir() else [path]
+        for f in files:
+            text = f.read_text(encoding="utf-8")
+            if text.strip():
+                texts.append(text)
+    return texts
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Linear-interpolated percentile of values (pct in 0..100). Returns 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def peak_memory_mb() -> float | None:
+    """Peak resident set size of this process in MB, or None where unsupported (e.g. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_one(text: str, api_key: str, fused: bool, model: str, with_chat: bool, budget: float | None = None) -> dict:
+    """Run one encounter end to end and return its outcome (no timing).
+
+    budget, in seconds, becomes the pipeline deadline counted from when the encounter starts.
+    """
+    from google import genai
+
+    import chat as chat_stage
+    from run_pipeline import format_output, run_encounter
+
+    deadline = time.monotonic() + budget if budget is not None else None
+    result = run_encounter(text, api_key=api_key, fused=fused, model=model, deadline=deadline)
+    if with_chat:
+        client = genai.Client(api_key=api_key)
+        session = chat_stage.create_chat(client, model=model)
+        chat_stage.load_transcript(session, format_output(result["labeled"]))
+        session.send_message(_CHAT_QUESTION)
+    return {"fallbacks": result["fallbacks"], "redone": result["redone"], "timed_out": result["timed_out"]}
+
+
+def run_load(
+    texts: list[str],
+    encounters: int,
+    rate: float,
+    concurrency: int,
+    api_key: str,
+    fused: bool = False,
+    model: str = "gemini-2.5-flash",
+    with_chat: bool = True,
+    seed: int | None = None,
+    budget: float | None = None,
+) -> tuple[list[dict], float]:
+    """Submit encounters with exponential inter-arrival times and wait for all of them.
+
+    Returns (records, wall_seconds). Each record has "latency" (arrival to completion),
+    "service" (start to completion), "error", "fallbacks", "redone" and "timed_out".
+    """
+    rng = random.Random(seed)
+    records: list[dict] = []
+    lock = threading.Lock()
+
+    def job(text: str, arrived: float) -> None:
+        started = time.perf_counter()
+        record = {"error": None, "fallbacks": [], "redone": [], "timed_out": []}
+        try:
+            record.update(run_one(text, api_key, fused, model, with_chat, budget))
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        finished = time.perf_counter()
+        record["latency"] = finished - arrived
+        record["service"] = finished - started
+        with lock:
+            records.append(record)
+
+    start = time.perf_counter()
+    next_arrival = start
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(encounters):
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(job, texts[i % len(texts)], next_arrival)
+            next_arrival += rng.expovariate(rate) if rate > 0 else 0.0
+    return records, time.perf_counter() - start
+
+
+def build_report(records: list[dict], wall_seconds: float, server_counts: dict | None) -> dict:
+    """Aggregate per-encounter records into the load-test report."""
+    n = len(records)
+    latencies = [r["latency"] for r in records if not r["error"]]
+    services = [r["service"] for r in records if not r["error"]]
+    errors = sum(1 for r in records if r["error"])
+    with_fallback = sum(1 for r in records if r["fallbacks"])
+    stage_fallbacks = {stage: sum(1 for r in records if stage in r["fallbacks"]) for stage in ("labels", "summary", "emr")}
+    with_redo = sum(1 for r in records if r["redone"])
+    with_timeout = sum(1 for r in records if r["timed_out"])
+    peak_mb = peak_memory_mb()
+    report = {
+        "encounters": n,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_per_s": round((n - errors) / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "latency_s": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3) if latencies else 0.0,
+        },
+        "service_s": {
+            "p50": round(percentile(services, 50), 3),
+            "p95": round(percentile(services, 95), 3),
+            "p99": round(percentile(services, 99), 3),
+        },
+        "error_rate": round(errors / n, 4) if n else 0.0,
+        "fallback_rate": round(with_fallback / n, 4) if n else 0.0,
+        "stage_fallback_rate": {k: round(v / n, 4) if n else 0.0 for k, v in stage_fallbacks.items()},
+        "fused_redo_rate": round(with_redo / n, 4) if n else 0.0,
+        "timed_out_rate": round(with_timeout / n, 4) if n else 0.0,
+        "peak_memory_mb": round(peak_mb, 1) if peak_mb is not None else None,
+        "errors": sorted({r["error"] for r in records if r["error"]})[:10],
+    }
+    if server_counts is not None:
+        report["server"] = dict(server_counts)
+    return report
+
+
+def format_report(report: dict) -> str:
+    lat, svc = report["latency_s"], report["service_s"]
+    lines = [
+        f"Encounters:       {report['encounters']} in {report['wall_seconds']}s",
+        f"Throughput:       {report['throughput_per_s']} encounters/s",
+        f"Latency (s):      p50={lat['p50']}  p95={lat['p95']}  p99={lat['p99']}  max={lat['max']}",
+        f"Service time (s): p50={svc['p50']}  p95={svc['p95']}  p99={svc['p99']}",
+        f"Error rate:       {report['error_rate']:.2%}",
+        f"Fallback rate:    {report['fallback_rate']:.2%} "
+        + "(" + ", ".join(f"{k} {v:.2%}" for k, v in report["stage_fallback_rate"].items()) + ")",
+        f"Fused redo rate:  {report['fused_redo_rate']:.2%}",
+        f"Timed-out rate:   {report['timed_out_rate']:.2%}",
+        f"Peak memory:      {report['peak_memory_mb']} MB" if report["peak_memory_mb"] is not None else "Peak memory:      n/a",
+    ]
+    if "server" in report:
+        s = report["server"]
+        lines.append(f"Server:           {s['requests']} requests, {s['429']} x 429, {s['500']} x 500, {s['input_chars']} input chars")
+    for err in report["errors"]:
+        lines.append(f"  error: {err}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    default_corpus = _REPO_ROOT / "speaker_diarization" / "conversation.txt"
+
+    parser = argparse.ArgumentParser(description="Load test the encounter pipeline against a stand-in Gemini server.")
+    parser.add_argument("corpus", nargs="*", default=[str(default_corpus)], help="Conversation .txt files or directories (default: speaker_diarization/conversation.txt)")
+    parser.add_argument("-n", "--encounters", type=int, default=50, help="Number of encounters to simulate (default: 50)")
+    parser.add_argument("--rate", type=float, default=2.0, help="Mean encounter arrivals per second; 0 sends all at once (default: 2)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum encounters processed at once (default: 8)")
+    parser.add_argument("--fused", action="store_true", help="Use the fused single-call pipeline mode")
+    parser.add_argument("--budget", type=float, default=None, metavar="SECONDS", help="Per-encounter pipeline time budget (see pipeline/run_pipeline.py)")
+    parser.add_argument("--no-chat", action="store_true", help="Skip the chat turn after the pipeline")
+    parser.add_argument("--model", default="gemini-2.5-flash", help="Model name sent to the server")
+    parser.add_argument("--base-url", default=None, help="Use an already running server instead of starting the stand-in")
+    parser.add_argument("--json", metavar="FILE", default=None, help="Also write the report as JSON to FILE")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    texts = load_corpus(args.corpus)
+    if not texts:
+        print("No conversations found in the corpus.", file=sys.stderr)
+        sys.exit(2)
+
+    fake = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        fake = fake_from_args(args)
+        server = start_server(fake)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["GOOGLE_GEMINI_BASE_URL"] = base_url
+    api_key = os.environ.get("GEMINI_API_KEY") or "load-test-key"
+
+    print(f"Replaying {args.encounters} encounters from {len(texts)} conversation(s) against {base_url} ...", file=sys.stderr)
+    records, wall = run_load(
+        texts,
+        encounters=args.encounters,
+        rate=args.rate,
+        concurrency=args.concurrency,
+        api_key=api_key,
+        fused=args.fused,
+        model=args.model,
+        with_chat=not args.no_chat,
+        seed=args.seed,
+        budget=args.budget,
+    )
+    report = build_report(records, wall, fake.counts if fake else None)
+    print(format_report(report))
+    if args.json:
+        out_path = Path(args.json)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Wrote report to: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
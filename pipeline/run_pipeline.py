@@ -0,0 +1,289 @@
+"""
+Run the full encounter pipeline: speaker labels -> patient summary -> EMR document.
+
+Defaults:
+ - input: `speaker_diarization/conversation.txt` (raw conversation)
+ - outputs: `labeled_transcript.txt` (repo root), `speaker_summary/summary.txt`
+   and `emr_generator/emr_document.json` (the same files the per-stage scripts write)
+
+By default each stage makes its own Gemini request, exactly like running diarize.py,
+summarize.py and generate_emr.py one after the other. With `--fused`, a single request
+asks for the labels, the summary and the EMR JSON together. Any part of the fused response
+that fails validation is redone with that stage's own Gemini call, and then with the stage's
+local fallback if that fails too.
+
+With `--budget SECONDS`, the whole run gets an end-to-end deadline. Each Gemini call's
+timeout is derived from the time left, split evenly over the stages still to run, and a
+stage whose share has run out uses its local fallback straight away. The run then reports
+that its result is degraded instead of waiting on the SDK.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+for _stage_dir in ("speaker_diarization", "speaker_summary", "emr_generator"):
+    sys.path.insert(0, str(_REPO_ROOT / _stage_dir))
+
+from diarize import _gemini_label_speakers, _remaining_ms, alternating_labels, format_output, segment_into_turns  # noqa: E402
+from generate_emr import EMR_SCHEMA, call_gemini_for_emr, fallback_emr_template, parse_json_text  # noqa: E402
+from summarize import SUMMARY_STYLE_RULES, build_prompt, call_gemini, extract_doctor_lines, simple_local_summary  # noqa: E402
+
+
+def _load_env() -> None:
+    try:
+        from dotenv import load_dotenv
+
+        env1 = _REPO_ROOT / ".env"
+        env2 = Path(__file__).resolve().parent / ".env"
+        if env2.is_file():
+            load_dotenv(env2)
+        elif env1.is_file():
+            load_dotenv(env1)
+        else:
+            load_dotenv()
+    except Exception:
+        pass
+
+
+def build_fused_prompt(turns: list[str]) -> str:
+    """Construct one prompt asking for speaker labels, the patient summary and the EMR at once."""
+    numbered = "\n".join(f"Turn {i + 1}: {t}" for i, t in enumerate(turns))
+    return f"""This is a doctor–patient conversation split into {len(turns)} numbered turns.
+Return ONE JSON object (no markdown, no explanation) with exactly these three keys:
+
+"labels": an array of exactly {len(turns)} strings, one per turn in order, each either "Doctor" or "Patient".
+Note: one speaker may speak more than one turn in a row.
+
+"summary": a string explaining what the Doctor turns say so the patient can easily understand.
+Write it as plain text inside the JSON string (use \\n for line breaks, no markdown).
+{SUMMARY_STYLE_RULES}
+
+"emr": an EMR document following this exact JSON schema. If a field cannot be inferred
+from the conversation, leave it as an empty string or empty array.
+{EMR_SCHEMA}
+
+Conversation:
+{numbered}"""
+
+
+def stage_deadline(deadline: float | None, stages_left: int) -> float | None:
+    """Give the next stage an equal share of the time left before deadline (a time.monotonic() value)."""
+    if deadline is None:
+        return None
+    now = time.monotonic()
+    return now + max(0.0, deadline - now) / max(1, stages_left)
+
+
+def call_gemini_fused(
+    turns: list[str], api_key: str, model: str = "gemini-2.5-flash", deadline: float | None = None
+) -> dict | None:
+    """Make the single fused Gemini request. Returns the parsed JSON object or None on failure."""
+    config: dict = {"response_mime_type": "application/json"}
+    if deadline is not None:
+        timeout_ms = _remaining_ms(deadline)
+        if timeout_ms == 0:
+            return None
+        config["http_options"] = {"timeout": timeout_ms}
+    try:
+        from google import genai
+    except Exception:
+        return None
+
+    try:
+        client = genai.Client(api_key=api_key)
+        response = client.models.generate_content(
+            model=model,
+            contents=build_fused_prompt(turns),
+            config=config,
+        )
+        if not response or not getattr(response, "text", None):
+            print("Gemini returned no fused response.", file=sys.stderr)
+            return None
+        data = parse_json_text(response.text)
+        return data if isinstance(data, dict) else None
+    except json.JSONDecodeError as e:
+        print(f"Failed to parse Gemini's fused JSON response: {e}", file=sys.stderr)
+        return None
+    except Exception as e:
+        print(f"Gemini API error: {e}", file=sys.stderr)
+        return None
+
+
+def validate_labels(labels: object, num_turns: int) -> list[str] | None:
+    """Return normalized labels if there is exactly one Doctor/Patient label per turn, else None."""
+    if not isinstance(labels, list) or len(labels) != num_turns:
+        return None
+    normalized = []
+    for label in labels:
+        if not isinstance(label, str) or label.strip().lower() not in ("doctor", "patient"):
+            return None
+        normalized.append(label.strip().capitalize())
+    return normalized
+
+
+def validate_summary(summary: object) -> str | None:
+    """Return the summary if it is a non-empty string, else None."""
+    if not isinstance(summary, str) or not summary.strip():
+        return None
+    return summary.strip()
+
+
+def validate_emr(emr: object) -> dict | None:
+    """Return the EMR if every top-level section of the template is present with the right type."""
+    if not isinstance(emr, dict):
+        return None
+    for key, blank in fallback_emr_template().items():
+        if not isinstance(emr.get(key), type(blank)):
+            return None
+    return emr
+
+
+def run_encounter(
+    text: str,
+    api_key: str | None = None,
+    fused: bool = False,
+    first_speaker: str = "doctor",
+    model: str = "gemini-2.5-flash",
+    deadline: float | None = None,
+) -> dict:
+    """Produce speaker labels, a patient summary and an EMR document for one conversation.
+
+    deadline is an absolute time.monotonic() value for the whole run, or None for no limit.
+
+    Returns a dict with:
+     - "labeled": list of (speaker_label, utterance) tuples
+     - "summary": patient-friendly summary text
+     - "emr": EMR document dict
+     - "redone": fused parts that failed validation and were redone per stage
+     - "fallbacks": stages that ended up using their local fallback
+     - "timed_out": fallback stages whose Gemini call hit its timeout or was skipped for lack of time
+       (stages that failed on a server error such as 429/500 are only in "fallbacks")
+     - "degraded": True if any part of the result comes from a local fallback
+    """
+    turns = segment_into_turns(text)
+    key = api_key.strip() if api_key and api_key.strip() else None
+
+    labels = summary = emr = None
+    redone: list[str] = []
+    if fused and key and turns:
+        parts = call_gemini_fused(turns, key, model=model, deadline=deadline)
+        if parts is None:
+            redone = ["labels", "summary", "emr"]
+            print("Warning: no fused response from Gemini; using per-stage calls.", file=sys.stderr)
+        else:
+            labels = validate_labels(parts.get("labels"), len(turns))
+            summary = validate_summary(parts.get("summary"))
+            emr = validate_emr(parts.get("emr"))
+            redone = [name for name, value in (("labels", labels), ("summary", summary), ("emr", emr)) if value is None]
+            if redone:
+                print(f"Warning: fused response invalid for {', '.join(redone)}; using per-stage calls.", file=sys.stderr)
+
+    fallbacks: list[str] = []
+    timed_out: list[str] = []
+
+    def out_of_time(stage: str, until: float | None) -> None:
+        # A failed stage has used up its share only if its call was skipped or ran into the
+        # per-call timeout; server errors return early, and label retries never sleep to the deadline.
+        if until is not None and _remaining_ms(until) == 0:
+            timed_out.append(stage)
+
+    if labels is None:
+        until = stage_deadline(deadline, sum(part is None for part in (labels, summary, emr)))
+        if key and turns:
+            labels = _gemini_label_speakers(turns, key, deadline=until)
+        if labels is None or len(labels) != len(turns):
+            labels = alternating_labels(len(turns), first_speaker)
+            if turns:
+                fallbacks.append("labels")
+                out_of_time("labels", until)
+    labeled = list(zip(labels, turns))
+
+    if summary is None:
+        until = stage_deadline(deadline, 2 if emr is None else 1)
+        doctor_utts = extract_doctor_lines(format_output(labeled))
+        if key:
+            summary = call_gemini(build_prompt("\n".join(doctor_utts)), key, model=model, deadline=until)
+        if not summary:
+            summary = simple_local_summary(doctor_utts)
+            fallbacks.append("summary")
+            out_of_time("summary", until)
+
+    if emr is None:
+        if key:
+            emr = call_gemini_for_emr(text, key, model=model, deadline=deadline)
+        if not emr:
+            emr = fallback_emr_template()
+            fallbacks.append("emr")
+            out_of_time("emr", deadline)
+
+    unavailable = [stage for stage in fallbacks if stage not in timed_out]
+    if timed_out:
+        print(f"Warning: time budget ran out for {', '.join(timed_out)}; using local fallback.", file=sys.stderr)
+    if key and unavailable:
+        print(f"Warning: Gemini unavailable for {', '.join(unavailable)}; using local fallback.", file=sys.stderr)
+
+    return {
+        "labeled": labeled,
+        "summary": summary,
+        "emr": emr,
+        "redone": redone,
+        "fallbacks": fallbacks,
+        "timed_out": timed_out,
+        "degraded": bool(fallbacks),
+    }
+
+
+def write_outputs(result: dict, labeled_path: Path, summary_path: Path, emr_path: Path) -> None:
+    """Write the three pipeline outputs in the same formats as the per-stage scripts."""
+    for path in (labeled_path, summary_path, emr_path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+    labeled_path.write_text(format_output(result["labeled"]), encoding="utf-8")
+    summary_path.write_text(result["summary"], encoding="utf-8")
+    with open(emr_path, "w", encoding="utf-8") as f:
+        json.dump(result["emr"], f, indent=2)
+
+
+def main() -> None:
+    _load_env()
+    default_input = _REPO_ROOT / "speaker_diarization" / "conversation.txt"
+
+    parser = argparse.ArgumentParser(description="Run diarization, patient summary and EMR generation on one conversation.")
+    parser.add_argument("input_file", nargs="?", default=str(default_input), help="Path to conversation.txt")
+    parser.add_argument("--labeled-output", default=str(_REPO_ROOT / "labeled_transcript.txt"), help="Labeled transcript output (default: labeled_transcript.txt)")
+    parser.add_argument("--summary-output", default=str(_REPO_ROOT / "speaker_summary" / "summary.txt"), help="Summary output (default: speaker_summary/summary.txt)")
+    parser.add_argument("--emr-output", default=str(_REPO_ROOT / "emr_generator" / "emr_document.json"), help="EMR output (default: emr_generator/emr_document.json)")
+    parser.add_argument("--fused", action="store_true", help="Request labels, summary and EMR in a single Gemini call")
+    parser.add_argument("--first", choices=["doctor", "patient"], default="doctor", help="Who speaks first when falling back to alternating labels (default: doctor)")
+    parser.add_argument("--model", default="gemini-2.5-flash", help="Gemini model to use")
+    parser.add_argument("--budget", type=float, default=None, metavar="SECONDS", help="End-to-end time budget; stages out of time use their local fallback")
+    args = parser.parse_args()
+    deadline = time.monotonic() + args.budget if args.budget is not None else None
+
+    input_path = Path(args.input_file)
+    if not input_path.is_file():
+        print(f"Input file not found: {input_path}", file=sys.stderr)
+        sys.exit(2)
+
+    text = input_path.read_text(encoding="utf-8")
+    api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+    result = run_encounter(
+        text, api_key=api_key, fused=args.fused, first_speaker=args.first, model=args.model, deadline=deadline
+    )
+
+    labeled_path, summary_path, emr_path = Path(args.labeled_output), Path(args.summary_output), Path(args.emr_output)
+    write_outputs(result, labeled_path, summary_path, emr_path)
+    print(f"Wrote labeled transcript to: {labeled_path}")
+    print(f"Wrote summary to: {summary_path}")
+    print(f"Wrote EMR document to: {emr_path}")
+    if result["degraded"]:
+        print(f"Result is DEGRADED: local fallback used for {', '.join(result['fallbacks'])}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,10 +39,26 @@ def segment_into_turns(text: str) -> list[str]:
     return turns
 
 
-def _gemini_label_speakers(turns: list[str], api_key: str) -> list[str] | None:
+def _remaining_ms(deadline: float | None) -> int | None:
+    """Whole milliseconds left until deadline (a time.monotonic() value), or None without one."""
+    if deadline is None:
+        return None
+    return max(0, int((deadline - time.monotonic()) * 1000))
+
+
+def alternating_labels(num_turns: int, first_speaker: str = "doctor") -> list[str]:
+    """Return alternating Doctor/Patient labels, starting with first_speaker."""
+    speakers = ["Doctor", "Patient"] if first_speaker.lower() == "doctor" else ["Patient", "Doctor"]
+    return [speakers[i % 2] for i in range(num_turns)]
+
+
+def _gemini_label_speakers(turns: list[str], api_key: str, deadline: float | None = None) -> list[str] | None:
     """
     Ask Gemini to label each turn as Doctor or Patient. Returns a list of "Doctor"/"Patient"
     in order, or None on failure.
+    When deadline (a time.monotonic() value) is given, each attempt's timeout is the time left,
+    no attempt starts after it has passed, and a failed attempt is only retried if the backoff
+    sleep ends before it.
     """
     if not turns:
         return []
@@ -69,20 +85,17 @@ Conversation:
 Labels (one per line):"""
 
     for attempt in range(3):
+        timeout_ms = _remaining_ms(deadline)
+        if timeout_ms == 0:
+            print("Speaker labeling deadline reached; giving up on Gemini.", file=sys.stderr)
+            break
         try:
-            # #region agent log
-            _dlog("diarize.py:_gemini_label_speakers", "before Gemini generate_content", {"attempt": attempt + 1, "num_turns": len(turns)}, "C")
-            # #endregion
-            
             # The new, correct way to call the model!
             response = client.models.generate_content(
                 model="gemini-2.5-flash",
-                contents=prompt
+                contents=prompt,
+                config={"http_options": {"timeout": timeout_ms}} if timeout_ms is not None else None,
             )
-            
-            # #region agent log
-            _dlog("diarize.py:_gemini_label_speakers", "after Gemini generate_content", {"has_response": response is not None, "has_text": bool(response and response.text)}, "C")
-            # #endregion
             if not response or not response.text:
                 continue
             lines = [ln.strip() for ln in response.text.strip().splitlines() if ln.strip()]
@@ -107,7 +120,14 @@ Labels (one per line):"""
         except Exception as e:
             # Actually print the error to the console so we can debug!
             print(f"API Error on attempt {attempt + 1}: {e}", file=sys.stderr)
-            time.sleep(1.0 * (attempt + 1))
+            if attempt < 2:
+                backoff = 1.0 * (attempt + 1)
+                left_ms = _remaining_ms(deadline)
+                if left_ms is not None and left_ms / 1000 <= backoff:
+                    # No retry could start before the deadline, so fall back now instead of sleeping.
+                    print("No time left to retry speaker labeling; giving up on Gemini.", file=sys.stderr)
+                    break
+                time.sleep(backoff)
             continue
     return None
 
@@ -116,27 +136,25 @@ def diarize(
     text: str,
     first_speaker: str = "doctor",
     api_key: str | None = None,
+    deadline: float | None = None,
 ) -> list[tuple[str, str]]:
     """
     Segment text into turns and label each as Doctor or Patient using Gemini when possible.
-    Falls back to alternating Doctor/Patient if API key is missing or the request fails.
+    Falls back to alternating Doctor/Patient if API key is missing, the request fails or
+    deadline (a time.monotonic() value) passes first.
     Returns a list of (speaker_label, utterance) tuples.
     """
     turns = segment_into_turns(text)
-    # #region agent log
-    _dlog("diarize.py:diarize", "after segment_into_turns", {"num_turns": len(turns)}, "B")
-    # #endregion
     if not turns:
         return []
 
     labels = None
     if api_key and api_key.strip():
-        labels = _gemini_label_speakers(turns, api_key.strip())
+        labels = _gemini_label_speakers(turns, api_key.strip(), deadline=deadline)
 
     if labels is None or len(labels) != len(turns):
         # Fallback: alternating
-        speakers = ["Doctor", "Patient"] if first_speaker.lower() == "doctor" else ["Patient", "Doctor"]
-        labels = [speakers[i % 2] for i in range(len(turns))]
+        labels = alternating_labels(len(turns), first_speaker)
         if api_key and api_key.strip():
             print("Warning: Gemini labeling failed or unavailable; using alternating Doctor/Patient.", file=sys.stderr)
 
@@ -174,41 +192,21 @@ def main() -> None:
         help="Who speaks first when falling back to alternating (default: doctor)",
     )
     args = parser.parse_args()
-    # #region agent log
-    _dlog("diarize.py:main", "main started", {"input_file": args.input_file, "cwd": os.getcwd()}, "A")
-    _dlog("diarize.py:main", "main started", {"input_file": args.input_file}, "E")
-    # #endregion
 
     if args.input_file is not None:
         with open(args.input_file, encoding="utf-8") as f:
             text = f.read()
     else:
         text = sys.stdin.read()
-    # #region agent log
-    _dlog("diarize.py:main", "after read file", {"len_text": len(text), "text_preview": text[:100] if text else ""}, "A")
-    # #endregion
 
     labeled = diarize(text, first_speaker=args.first, api_key=api_key)
-    # #region agent log
-    _dlog("diarize.py:main", "after diarize", {"len_labeled": len(labeled)}, "D")
-    # #endregion
     out = format_output(labeled)
-    # #region agent log
-    _dlog("diarize.py:main", "before print/write", {"len_out": len(out)}, "D")
-    _dlog("diarize.py:main", "before print/write", {"len_out": len(out)}, "E")
-    # #endregion
 
     if args.output:
         with open(args.output, "w", encoding="utf-8") as f:
             f.write(out)
     else:
-        # #region agent log
-        _dlog("diarize.py:main", "about to print stdout", {"len_out": len(out), "out_preview": out[:200]}, "F2")
-        # #endregion
         print(out, flush=True)
-        # #region agent log
-        _dlog("diarize.py:main", "after print stdout", {}, "F2")
-        # #endregion
 
 
 if __name__ == "__main__":
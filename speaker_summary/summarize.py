@@ -90,7 +90,38 @@ def simple_local_summary(utterances: list[str]) -> str:
     return header + "\n".join(bullets)
 
 
-def call_gemini(prompt: str, api_key: str, model: str = "gemini-2.5-flash") -> str | None:
+# Style rules for the summary text itself; also used for the "summary" field of the fused pipeline prompt.
+SUMMARY_STYLE_RULES = (
+    "Use short sentences, avoid complex medical jargon when possible, and replace technical words with simple alternatives. "
+    "Start with a one-line TL;DR sentence, then list clear action items the patient should follow. "
+    "If applicable, describe the recovery plan in detail. If the doctor gave medication, dosage, or follow-up instructions, "
+    "list them explicitly. Keep the summary under 300 words."
+)
+
+SUMMARY_INSTRUCTIONS = (
+    "You are a helpful assistant. This is a conversation between a doctor and a patient. "
+    "Your goal is to summarize WHAT THE DOCTOR IS SAYING so the patient can easily understand. "
+    "Present the output as a short plain-text summary (no JSON or markup). "
+    + SUMMARY_STYLE_RULES
+)
+
+
+def _remaining_ms(deadline: float | None) -> int | None:
+    """Whole milliseconds left until deadline (a time.monotonic() value), or None without one."""
+    if deadline is None:
+        return None
+    return max(0, int((deadline - time.monotonic()) * 1000))
+
+
+def call_gemini(prompt: str, api_key: str, model: str = "gemini-2.5-flash", deadline: float | None = None) -> str | None:
+    """Return Gemini's summary text, or None on failure.
+
+    With a deadline (a time.monotonic() value) the request times out when it passes,
+    and is not sent at all if it already has.
+    """
+    timeout_ms = _remaining_ms(deadline)
+    if timeout_ms == 0:
+        return None
     try:
         from google import genai
     except Exception:
@@ -98,7 +129,8 @@ def call_gemini(prompt: str, api_key: str, model: str = "gemini-2.5-flash") -> s
 
     try:
         client = genai.Client(api_key=api_key)
-        response = client.models.generate_content(model=model, contents=prompt)
+        config = {"http_options": {"timeout": timeout_ms}} if timeout_ms is not None else None
+        response = client.models.generate_content(model=model, contents=prompt, config=config)
         if not response or not getattr(response, "text", None):
             return None
         return response.text
@@ -112,16 +144,7 @@ def build_prompt(doctor_text: str) -> str:
 
     The prompt asks for simple language, short sentences, and clear action items.
     """
-    instructions = (
-        "You are a helpful assistant. This is a conversation between a doctor and a patient. "
-        "Your goal is to summarize WHAT THE DOCTOR IS SAYING so the patient can easily understand. "
-        "Use short sentences, avoid complex medical jargon when possible, and replace technical words with simple alternatives. "
-        "Present the output as a short plain-text summary (no JSON or markup). Start with a one-line. If applicable, describe recovery plan in detail."
-        "TL;DR sentence, then list clear action items the patient should follow. If the doctor gave medication, dosage, or follow-up instructions, "
-        "list them explicitly. Keep the summary under 300 words."
-    )
-
-    prompt = f"{instructions}\n\nConversation (only doctor utterances):\n{doctor_text}\n\nSummary:" 
+    prompt = f"{SUMMARY_INSTRUCTIONS}\n\nConversation (only doctor utterances):\n{doctor_text}\n\nSummary:" 
     return prompt
 
 